@@ -2,24 +2,42 @@ import os
 import yaml
 import markdown
 from markdown.extensions.toc import TocExtension
-from jinja2 import Environment, FileSystemLoader
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
 from datetime import datetime
 import argparse
 import shutil
 import hashlib
 import json
 import re
+import functools
+import operator
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from collections import defaultdict
-from html import escape
-from html.parser import HTMLParser
+from collections.abc import Mapping
+from html import unescape
+from xml.sax.saxutils import escape as xml_escape
 try:
     import dotenv
     dotenv.load_dotenv()
 except ImportError:
     pass
+import pygments
 from pygments.formatters import HtmlFormatter
 from pygments.util import ClassNotFound
 import stat
+import tempfile
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    from yaml import CSafeLoader as _YAMLLoader
+except ImportError:
+    from yaml import SafeLoader as _YAMLLoader
 
 DEFAULT_PYGMENTS_THEME = "native"
 TEMPLATE_DIR = "templates"
@@ -28,20 +46,119 @@ OUTPUT_DIR = "."
 IMAGES_DIR = "assets/images"
 CONTENT_DIR = "content"
 POSTS_DIR = "content/posts"
+CONTENT_SUFFIXES = (".md", ".markdown")
 
 PAGE_SLUG_CACHE = ".cache/page-slugs.json"
+FILE_STAMP_CACHE = ".cache/file-stamps.json"
+STYLE_STAMP_CACHE = ".cache/style-stamps.json"
+RENDER_SIG_CACHE = ".cache/render-sigs.json"
+MARKDOWN_CACHE_DIR = ".cache/md"
+MARKDOWN_CACHE_INDEX = ".cache/md/index.json"
+# Bumped to drop entries written before cache writes were atomic
+MARKDOWN_CACHE_VERSION = 2
+TEMPLATE_BYTECODE_DIR = ".cache/jinja"
+TEMPLATE_INDEX_CACHE = ".cache/template-index.json"
+PARALLEL_MIN_FILES = 32
 IMAGE_MANIFEST_PATH = ".cache/image-manifest.json"
 GENERATED_THEME_PATH = "assets/css/generated.daisyui.css"
 GENERATED_FONTS_PATH = "assets/css/generated.fonts.css"
 GENERATED_SYNTAX_PATH = "assets/css/syntax.css"
 
 
+_O_BINARY = getattr(os, "O_BINARY", 0)
+
+
+def _read_bytes(path):
+    # A single fstat-sized os.read skips the buffered reader's grow loop,
+    # which is most of the cost for the small files read here.
+    fd = os.open(path, os.O_RDONLY | _O_BINARY)
+    try:
+        size = os.fstat(fd).st_size
+        data = os.read(fd, size)
+        while len(data) < size:
+            chunk = os.read(fd, size - len(data))
+            if not chunk:
+                break
+            data += chunk
+    finally:
+        os.close(fd)
+    return data
+
+
+def _read_text(path):
+    return _read_bytes(path).decode("utf-8")
+
+
+def _write_bytes(path, data):
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | _O_BINARY, 0o666)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+
+def _write_text(path, text):
+    _write_bytes(path, text.encode("utf-8"))
+
+
+def _replace_text(path, text):
+    # Write beside the target and rename into place, as Jinja's bytecode
+    # cache does, so an interrupted build or a concurrent worker never
+    # leaves a truncated file under the final name.
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        try:
+            view = memoryview(text.encode("utf-8"))
+            while view:
+                view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _json_loads(data):
+    # orjson's JSONDecodeError subclasses json's, so callers catch either.
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _json_dumps(obj):
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode("utf-8")
+
+
+def _load_json_dict(path):
+    # A missing, unreadable or corrupt cache just means starting fresh.
+    try:
+        data = _json_loads(_read_bytes(path))
+    except (FileNotFoundError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _save_json(path, obj, label):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        _write_bytes(path, _json_dumps(obj))
+    except OSError as e:
+        print(f"Warning: Could not save {label}: {e}")
+
+
 def load_previous_slugs():
     try:
-        with open(PAGE_SLUG_CACHE, "r", encoding="utf-8") as f:
-            return set(json.load(f))
+        return frozenset(_json_loads(_read_bytes(PAGE_SLUG_CACHE)))
     except (FileNotFoundError, json.JSONDecodeError):
-        return set()
+        return frozenset()
 
 
 def _on_rm_error(func, path, exc_info):
@@ -62,12 +179,61 @@ def _on_rm_error(func, path, exc_info):
 def save_current_slugs(slugs):
     os.makedirs(os.path.dirname(PAGE_SLUG_CACHE), exist_ok=True)
     try:
-        with open(PAGE_SLUG_CACHE, "w", encoding="utf-8") as f:
-            json.dump(sorted(slugs), f)
+        _write_bytes(PAGE_SLUG_CACHE, _json_dumps(sorted(slugs)))
     except OSError as e:
         print(f"Warning: Could not save slug cache: {e}")
 
 
+def _remove_stale_dir(out_dir):
+    try:
+        shutil.rmtree(out_dir, onerror=_on_rm_error)
+        print(f"Removed stale page directory: {out_dir}")
+    except Exception as e:
+        print(f"Warning: Could not remove stale page directory {out_dir}: {e}")
+
+
+def _has_stale_ancestor(slug, stale):
+    parent = slug
+    while "/" in parent:
+        parent = parent.rsplit("/", 1)[0]
+        if parent in stale:
+            return True
+    return False
+
+
+def remove_stale_pages(slugs):
+    # `slugs` can be a lazy iterable; only directories that still exist are
+    # collected. One listing of the output root, taken when the first
+    # candidate shows up, answers top-level slugs without a stat each; only
+    # nested slugs still need their own isdir check.
+    top_dirs = None
+    stale = {}
+    for slug in slugs:
+        if slug == "index":
+            continue
+        if top_dirs is None:
+            with os.scandir(OUTPUT_DIR) as it:
+                top_dirs = {entry.name for entry in it if entry.is_dir()}
+        head, sep, _ = slug.partition("/")
+        if head not in top_dirs:
+            continue
+        out_dir = os.path.join(OUTPUT_DIR, slug)
+        if not sep or os.path.isdir(out_dir):
+            stale[slug] = out_dir
+    if not stale:
+        return
+    # Removing a parent takes its children with it; handing both to the pool
+    # would have two threads racing rmtree over the same tree.
+    out_dirs = [
+        out_dir
+        for slug, out_dir in stale.items()
+        if not _has_stale_ancestor(slug, stale)
+    ]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        for _ in executor.map(_remove_stale_dir, out_dirs):
+            pass
+
+
 def clean_output(directory):
     print("Cleaning old build files...")
     preserved_roots = {
@@ -111,43 +277,79 @@ def clean_output(directory):
         ".gitignore",
     }
 
-    for name in os.listdir(directory):
-        path = os.path.join(directory, name)
-        
-        if name in preserved_roots or name in preserved_files:
-            continue
-            
-        if name.startswith(".") and name not in preserved_roots:
-            continue
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            name = entry.name
+            path = entry.path
 
-        try:
-            if os.path.isfile(path) or os.path.islink(path):
-                os.remove(path)
-                print(f"Deleted file: {path}")
-            elif os.path.isdir(path):
-                shutil.rmtree(path, onerror=_on_rm_error)
-                print(f"Deleted directory: {path}")
-        except Exception as e:
-            print(f"Failed to delete {path}: {e}")
+            if name in preserved_roots or name in preserved_files:
+                continue
 
+            if name.startswith(".") and name not in preserved_roots:
+                continue
 
+            try:
+                if entry.is_file() or entry.is_symlink():
+                    os.remove(path)
+                    print(f"Deleted file: {path}")
+                elif entry.is_dir(follow_symlinks=False):
+                    shutil.rmtree(path, onerror=_on_rm_error)
+                    print(f"Deleted directory: {path}")
+            except Exception as e:
+                print(f"Failed to delete {path}: {e}")
 
-def has_file_changed(filepath, cache_dir=".cache"):
-    os.makedirs(cache_dir, exist_ok=True)
-    rel = os.path.relpath(filepath)
-    file_hash = hashlib.md5(open(filepath, "rb").read()).hexdigest()
-    safe_name = rel.replace(os.sep, "__") + ".hash"
-    cache_file = os.path.join(cache_dir, safe_name)
 
-    if os.path.exists(cache_file):
-        with open(cache_file, "r", encoding="utf-8") as f:
-            cached_hash = f.read().strip()
-        if cached_hash == file_hash:
-            return False
 
-    with open(cache_file, "w", encoding="utf-8") as f:
-        f.write(file_hash)
-    return True
+def _hash_file(filepath, chunk_size=1 << 20):
+    hasher = xxhash.xxh3_64() if xxhash else hashlib.blake2b(digest_size=16)
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def has_file_changed(filepath, stamps):
+    # stamps maps relpath -> [size, mtime_ns, hash]; the hash is only
+    # recomputed when size or mtime differ from the recorded stamp.
+    rel = os.path.relpath(filepath)
+    st = os.stat(filepath)
+    cached = stamps.get(rel)
+    if cached and cached[:2] == [st.st_size, st.st_mtime_ns]:
+        return False
+
+    file_hash = _hash_file(filepath)
+    stamps[rel] = [st.st_size, st.st_mtime_ns, file_hash]
+    return not cached or cached[2] != file_hash
+
+
+_DATE_FORMATS = (
+    "%Y-%m-%d",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S.%f",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M:%S.%f",
+    "%Y/%m/%d",
+    "%d-%m-%Y",
+    "%d/%m/%Y",
+    "%Y-%m",
+    "%Y",
+)
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_date_string(date_value):
+    # fromisoformat is implemented in C and covers the canonical
+    # YYYY-MM-DD form, so the strptime table is only a fallback.
+    try:
+        return datetime.fromisoformat(date_value)
+    except ValueError:
+        pass
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(date_value, fmt)
+        except ValueError:
+            continue
+    return None
 
 
 def safe_parse_date(date_value):
@@ -159,33 +361,46 @@ def safe_parse_date(date_value):
         return date_value
 
     if isinstance(date_value, str):
-        formats = [
-            "%Y-%m-%d",
-            "%Y-%m-%dT%H:%M:%S",
-            "%Y-%m-%dT%H:%M:%S.%f",
-            "%Y-%m-%d %H:%M:%S",
-            "%Y-%m-%d %H:%M:%S.%f",
-            "%Y/%m/%d",
-            "%d-%m-%Y",
-            "%d/%m/%Y",
-            "%Y-%m",
-            "%Y",
-        ]
-        for fmt in formats:
-            try:
-                return datetime.strptime(date_value, fmt)
-            except ValueError:
-                continue
-        
-        try:
-            return datetime.fromisoformat(date_value)
-        except ValueError:
-            pass
+        parsed = _parse_date_string(date_value)
+        if parsed is not None:
+            return parsed
 
     print(f"Warning: Could not parse date: {date_value}")
     return None
 
 
+def _stringify_keys(value):
+    # YAML happily loads bool and int keys (`on:`, `404:`) next to strings;
+    # json can't sort such mixes, so keys are stringified and kept in their
+    # loaded order instead.
+    if isinstance(value, dict):
+        return [[str(k), _stringify_keys(v)] for k, v in value.items()]
+    if isinstance(value, (list, tuple)):
+        return [_stringify_keys(v) for v in value]
+    return value
+
+
+def _digest(*parts):
+    # Digest of build inputs for the style stamps and render signatures.
+    # Includes this script's mtime so changes to the code that produced an
+    # output also invalidate it.
+    payload = json.dumps(
+        _stringify_keys([os.stat(__file__).st_mtime_ns, *parts]), default=str
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _current_stamp(stamps, output_path, digest):
+    stamp = stamps.get(output_path) if stamps is not None else None
+    if (
+        isinstance(stamp, dict)
+        and stamp.get("digest") == digest
+        and os.path.exists(output_path)
+    ):
+        return stamp
+    return None
+
+
 def _ensure_sequence(value):
     if value is None:
         return []
@@ -194,15 +409,19 @@ def _ensure_sequence(value):
     return [value]
 
 
+_CSS_KEY_RE = re.compile(r"[^a-z0-9-]+")
+_CSS_SCALAR_RE = re.compile(r'[\s;:"]')
+
+
 def _format_css_scalar(value):
-    if isinstance(value, bool):
+    if type(value) is bool:
         return "true" if value else "false"
-    if isinstance(value, (int, float)) and not isinstance(value, bool):
+    if isinstance(value, (int, float)):
         return str(value)
     if isinstance(value, str):
         if not value:
             return '""'
-        if re.search(r"[\s;:\"]", value):
+        if _CSS_SCALAR_RE.search(value):
             return json.dumps(value)
         return value
     return json.dumps(value)
@@ -251,9 +470,12 @@ def normalize_theme_config(config):
     return normalized
 
 
-def write_theme_file(config, output_path=GENERATED_THEME_PATH):
+def write_theme_file(config, output_path=GENERATED_THEME_PATH, stamps=None):
     theme = config.get("theme") or {}
     print(f"DEBUG: write_theme_file theme config: {theme}")
+    digest = _digest("theme", theme)
+    if _current_stamp(stamps, output_path, digest):
+        return
     include = theme.get("include") or []
     include_list = _ensure_sequence(include)
 
@@ -266,65 +488,60 @@ def write_theme_file(config, output_path=GENERATED_THEME_PATH):
         names.append(name)
         seen.add(name)
 
-    css_blocks = []
-    if names:
-        joined_names = ", ".join(names)
-        css_blocks.append(f'@plugin "daisyui" {{\n  themes: {joined_names};\n}}')
-    else:
-        css_blocks.append('@plugin "daisyui" {\n  themes: all;\n}')
-
     custom = theme.get("custom")
     custom_items = custom.items() if isinstance(custom, dict) else []
     default_theme = theme.get("default")
 
-    for name, values in custom_items:
-        if not name or not values:
-            continue
-
-        lines = ['@plugin "daisyui/theme" {']
-        
-        # Determine strict defaults
-        is_default = bool(default_theme and default_theme == name)
-        
-        if isinstance(values, str):
-            # Raw css mode
-            # We still need to provide name and default properties for daisyui plugin to work
-             lines.append(f"  name: {_format_css_scalar(name)};")
-             lines.append(f"  default: {_format_css_scalar(is_default)};")
-             lines.append(values)
-        elif isinstance(values, dict):
-             seen_keys = set()
-             
-             theme_name = values.get("name") if isinstance(values.get("name"), str) else None
-             theme_name = theme_name.strip() if theme_name else name
-             lines.append(f"  name: {_format_css_scalar(theme_name)};")
-             seen_keys.add("name")
-
-             if "default" in values:
-                 lines.append(f"  default: {_format_css_scalar(values['default'])};")
-                 seen_keys.add("default")
-             else:
-                 lines.append(f"  default: {_format_css_scalar(is_default)};")
-                 seen_keys.add("default")
-
-             for key, value in values.items():
-                 if key in seen_keys:
-                     continue
-                 lines.append(f"  {key}: {_format_css_scalar(value)};")
-                 seen_keys.add(key)
-        else:
-            continue
-
-        lines.append("}")
-        css_blocks.append("\n".join(lines))
-
-    css_content = "\n\n".join(css_blocks) + "\n"
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     try:
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(css_content)
+        with open(output_path, "w", encoding="utf-8", buffering=1 << 20) as f:
+            if names:
+                joined_names = ", ".join(names)
+                f.write(f'@plugin "daisyui" {{\n  themes: {joined_names};\n}}\n')
+            else:
+                f.write('@plugin "daisyui" {\n  themes: all;\n}\n')
+
+            for name, values in custom_items:
+                if not name or not values or not isinstance(values, (str, dict)):
+                    continue
+
+                f.write('\n@plugin "daisyui/theme" {\n')
+
+                # Determine strict defaults
+                is_default = bool(default_theme and default_theme == name)
+
+                if isinstance(values, str):
+                    # Raw css mode
+                    # We still need to provide name and default properties for daisyui plugin to work
+                    f.write(f"  name: {_format_css_scalar(name)};\n")
+                    f.write(f"  default: {_format_css_scalar(is_default)};\n")
+                    f.write(f"{values}\n")
+                else:
+                    seen_keys = set()
+
+                    theme_name = values.get("name") if isinstance(values.get("name"), str) else None
+                    theme_name = theme_name.strip() if theme_name else name
+                    f.write(f"  name: {_format_css_scalar(theme_name)};\n")
+                    seen_keys.add("name")
+
+                    if "default" in values:
+                        f.write(f"  default: {_format_css_scalar(values['default'])};\n")
+                    else:
+                        f.write(f"  default: {_format_css_scalar(is_default)};\n")
+                    seen_keys.add("default")
+
+                    for key, value in values.items():
+                        if key in seen_keys:
+                            continue
+                        f.write(f"  {key}: {_format_css_scalar(value)};\n")
+                        seen_keys.add(key)
+
+                f.write("}\n")
     except OSError as e:
         print(f"Error: Failed to write theme file {output_path}: {e}")
+        return
+    if stamps is not None:
+        stamps[output_path] = {"digest": digest}
 
 
 def _normalize_font_family(value):
@@ -338,13 +555,16 @@ def _normalize_font_family(value):
 
 
 def _css_safe_key(name):
-    slug = re.sub(r"[^a-z0-9-]+", "-", str(name).strip().lower())
+    slug = _CSS_KEY_RE.sub("-", str(name).strip().lower())
     slug = slug.strip("-")
     return slug or "custom"
 
 
-def write_font_file(config, output_path=GENERATED_FONTS_PATH):
+def write_font_file(config, output_path=GENERATED_FONTS_PATH, stamps=None):
     fonts_config = config.get("fonts") or {}
+    digest = _digest("fonts", fonts_config)
+    if _current_stamp(stamps, output_path, digest):
+        return
     import_entries = [
         str(item).strip()
         for item in _ensure_sequence(fonts_config.get("imports") or fonts_config.get("import"))
@@ -386,67 +606,58 @@ def write_font_file(config, output_path=GENERATED_FONTS_PATH):
             continue
         variables.append((key, custom_value))
 
-    lines = []
-
-    for item in import_entries:
-        if item.startswith("@import"):
-            lines.append(item if item.endswith(";") else f"{item};")
-        else:
-            lines.append(f'@import url("{item}");')
-
-    if import_entries:
-        lines.append("")
-
-    for entry in custom_entries:
-        if isinstance(entry, dict):
-            block_lines = ["@font-face {"]
-            for prop, value in entry.items():
-                formatted = _format_css_scalar(value)
-                if not formatted:
-                    continue
-                block_lines.append(f"  {prop}: {formatted};")
-            block_lines.append("}")
-            lines.append("\n".join(block_lines))
-        elif entry:
-            lines.append(str(entry))
-
-    if custom_entries:
-        lines.append("")
-
-    if variables:
-        lines.append(":root {")
-        for key, value in variables:
-            lines.append(f"  --font-{_css_safe_key(key)}: {value};")
-        lines.append("}")
-        lines.append("")
-
-    lines.append("body {")
-    lines.append(f"  font-family: var(--font-body, {default_body});")
-    lines.append("}")
-    lines.append("")
-
-    lines.append("h1, h2, h3, h4, h5, h6 {")
-    lines.append(
-        f"  font-family: var(--font-heading, var(--font-body, {default_body}));"
-    )
-    lines.append("}")
-    lines.append("")
-
-    lines.append("code, pre, kbd, samp {")
-    lines.append(
-        f"  font-family: var(--font-mono, {default_mono});"
-    )
-    lines.append("}")
-    lines.append("")
-
-    css_output = "\n".join(lines).rstrip() + "\n"
-
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     try:
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(css_output)
+        with open(output_path, "w", encoding="utf-8", buffering=1 << 20) as f:
+            for item in import_entries:
+                if item.startswith("@import"):
+                    f.write(item if item.endswith(";") else f"{item};")
+                    f.write("\n")
+                else:
+                    f.write(f'@import url("{item}");\n')
+
+            if import_entries:
+                f.write("\n")
+
+            for entry in custom_entries:
+                if isinstance(entry, dict):
+                    f.write("@font-face {\n")
+                    for prop, value in entry.items():
+                        formatted = _format_css_scalar(value)
+                        if not formatted:
+                            continue
+                        f.write(f"  {prop}: {formatted};\n")
+                    f.write("}\n")
+                elif entry:
+                    f.write(f"{entry}\n")
+
+            if custom_entries:
+                f.write("\n")
+
+            if variables:
+                f.write(":root {\n")
+                for key, value in variables:
+                    f.write(f"  --font-{_css_safe_key(key)}: {value};\n")
+                f.write("}\n\n")
+
+            f.write("body {\n")
+            f.write(f"  font-family: var(--font-body, {default_body});\n")
+            f.write("}\n\n")
+
+            f.write("h1, h2, h3, h4, h5, h6 {\n")
+            f.write(
+                f"  font-family: var(--font-heading, var(--font-body, {default_body}));\n"
+            )
+            f.write("}\n\n")
+
+            f.write("code, pre, kbd, samp {\n")
+            f.write(f"  font-family: var(--font-mono, {default_mono});\n")
+            f.write("}\n")
     except OSError as e:
         print(f"Error: Failed to write font file {output_path}: {e}")
+        return
+    if stamps is not None:
+        stamps[output_path] = {"digest": digest}
 
 
 def resolve_pygments_theme(config):
@@ -475,7 +686,12 @@ def resolve_pygments_theme(config):
     return theme
 
 
-def generate_syntax_css(theme, output_path=GENERATED_SYNTAX_PATH):
+def generate_syntax_css(theme, output_path=GENERATED_SYNTAX_PATH, stamps=None):
+    digest = _digest("syntax", theme, pygments.__version__)
+    stamp = _current_stamp(stamps, output_path, digest)
+    if stamp and stamp.get("theme"):
+        return stamp["theme"]
+
     try:
         formatter = HtmlFormatter(style=theme)
         active_theme = theme
@@ -490,10 +706,50 @@ def generate_syntax_css(theme, output_path=GENERATED_SYNTAX_PATH):
     css = formatter.get_style_defs(".highlight")
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     try:
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(css + "\n")
+        _write_text(output_path, css + "\n")
     except OSError as e:
         print(f"Error: Failed to write syntax CSS {output_path}: {e}")
+        return active_theme
+    if stamps is not None:
+        stamps[output_path] = {"digest": digest, "theme": active_theme}
+    return active_theme
+
+
+def load_site_config(config_path=CONFIG_FILE):
+    config = yaml.load(_read_text(config_path), Loader=_YAMLLoader) or {}
+    normalize_theme_config(config)
+    resolve_pygments_theme(config)
+    return config
+
+
+def regenerate_css(
+    config,
+    theme_path=GENERATED_THEME_PATH,
+    fonts_path=GENERATED_FONTS_PATH,
+    only_if_changed=False,
+):
+    syntax_config = config.setdefault("syntax", {})
+    stamps = _load_json_dict(STYLE_STAMP_CACHE)
+    # Digest the whole config before the active theme is written back so
+    # the value stays comparable with a freshly loaded config.
+    config_digest = _digest("config", config)
+
+    if only_if_changed:
+        stamp = _current_stamp(stamps, CONFIG_FILE, config_digest)
+        outputs = (theme_path, fonts_path, GENERATED_SYNTAX_PATH)
+        if stamp and stamp.get("theme") and all(os.path.exists(p) for p in outputs):
+            syntax_config["pygments_theme_resolved"] = stamp["theme"]
+            return stamp["theme"]
+
+    write_theme_file(config, theme_path, stamps)
+    write_font_file(config, fonts_path, stamps)
+    active_theme = generate_syntax_css(
+        syntax_config.get("pygments_theme_resolved") or DEFAULT_PYGMENTS_THEME,
+        stamps=stamps,
+    )
+    syntax_config["pygments_theme_resolved"] = active_theme
+    stamps[CONFIG_FILE] = {"digest": config_digest, "theme": active_theme}
+    _save_json(STYLE_STAMP_CACHE, stamps, "style stamps")
     return active_theme
 
 
@@ -502,14 +758,8 @@ def generate_styles(
     theme_path=GENERATED_THEME_PATH,
     fonts_path=GENERATED_FONTS_PATH,
 ):
-    with open(config_path, "r", encoding="utf-8") as f:
-        config = yaml.safe_load(f) or {}
-    normalize_theme_config(config)
-    pygments_theme = resolve_pygments_theme(config)
-    write_theme_file(config, theme_path)
-    write_font_file(config, fonts_path)
-    active_theme = generate_syntax_css(pygments_theme)
-    config.setdefault("syntax", {})["pygments_theme_resolved"] = active_theme
+    config = load_site_config(config_path)
+    active_theme = regenerate_css(config, theme_path, fonts_path)
     return config, active_theme
 
 
@@ -524,7 +774,7 @@ MARKDOWN_EXTENSIONS = [
     TocExtension(permalink=False),
 ]
 
-def build_markdown(pygments_theme, markdown_config=None):
+def _resolve_md_config(markdown_config, pygments_theme):
     if markdown_config is None:
         markdown_config = {}
 
@@ -570,53 +820,214 @@ def build_markdown(pygments_theme, markdown_config=None):
                         else:
                             extension_configs[name] = config
 
-    
+    return extensions, extension_configs
+
+
+def build_markdown(extensions, extension_configs):
     return markdown.Markdown(
         extensions=extensions, extension_configs=extension_configs
     )
 
 
+def load_markdown_cache_index():
+    try:
+        index = json.loads(_read_text(MARKDOWN_CACHE_INDEX))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    return index if isinstance(index, dict) else {}
+
+
+def save_markdown_cache_index(index, sources=None):
+    # The index maps each source file to its cached HTML. Full builds pass the
+    # sources they saw so removed files drop out; any HTML no longer referenced
+    # is deleted, which bounds the cache to the live content.
+    if sources is not None:
+        index = {path: key for path, key in index.items() if path in sources}
+    live = {f"{key}.html" for key in index.values()}
+    try:
+        with os.scandir(MARKDOWN_CACHE_DIR) as it:
+            for entry in it:
+                # Leftover .tmp files come from writes that were killed
+                # before they could be renamed into place.
+                if entry.name.endswith((".html", ".tmp")) and entry.name not in live:
+                    try:
+                        os.remove(entry.path)
+                    except OSError:
+                        pass
+    except FileNotFoundError:
+        pass
+    os.makedirs(MARKDOWN_CACHE_DIR, exist_ok=True)
+    try:
+        _replace_text(MARKDOWN_CACHE_INDEX, json.dumps(index))
+    except OSError as e:
+        print(f"Warning: Could not save markdown cache index: {e}")
+
+
+def _markdown_cache_salt(extensions, extension_configs):
+    # Rendered HTML depends on the extension setup as well as the body, so
+    # theme or extension changes must produce different cache keys.
+    return json.dumps(
+        [
+            MARKDOWN_CACHE_VERSION,
+            markdown.__version__,
+            pygments.__version__,
+            extensions,
+            extension_configs,
+        ],
+        sort_keys=True,
+        default=str,
+    )
+
+
+def _scan_files(directory, suffixes=None, prefix="", visited=None):
+    # Yields (DirEntry, relative posix path) in the same top-down order as
+    # os.walk, using the dirent type cached by scandir instead of a stat
+    # per entry. Directory paths are appended to `visited` when given.
+    if visited is not None:
+        visited.append(directory)
+    subdirs = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry)
+            elif not suffixes or entry.name.endswith(suffixes):
+                yield entry, prefix + entry.name
+    for entry in subdirs:
+        yield from _scan_files(entry.path, suffixes, prefix + entry.name + "/", visited)
+
+
+class TemplateRegistry(Mapping):
+    """Maps layout aliases to template names, loading templates on first use."""
+
+    def __init__(self, env, names):
+        self.env = env
+        self.names = names
+        self.loaded = {}
+
+    def __getitem__(self, key):
+        # Keep the resolved template: env.get_template would re-check the
+        # source mtime on every page that uses the same layout.
+        try:
+            return self.loaded[key]
+        except KeyError:
+            template = self.loaded[key] = self.env.get_template(self.names[key])
+            return template
+
+    def __contains__(self, key):
+        return key in self.names
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+
+def build_environment(template_dir=TEMPLATE_DIR):
+    os.makedirs(TEMPLATE_BYTECODE_DIR, exist_ok=True)
+    return Environment(
+        loader=FileSystemLoader(template_dir),
+        bytecode_cache=FileSystemBytecodeCache(TEMPLATE_BYTECODE_DIR),
+    )
+
+
+def _load_template_index(template_dir, allowed_extensions):
+    # The alias map only depends on which files exist, so it stays valid
+    # while the mtime of every directory in the tree is unchanged.
+    try:
+        cached = json.loads(_read_text(TEMPLATE_INDEX_CACHE))
+        if (
+            cached["root"] == template_dir
+            and cached["extensions"] == list(allowed_extensions or ())
+            and all(
+                os.stat(path).st_mtime_ns == mtime
+                for path, mtime in cached["dirs"].items()
+            )
+        ):
+            return cached["names"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return None
+
+
 def load_templates(env, template_dir=TEMPLATE_DIR, allowed_extensions=(".html", ".jinja", ".jinja2", ".j2")):
-    templates = {}
-    for root, _, files in os.walk(template_dir):
-        for filename in files:
-            if allowed_extensions and not filename.endswith(allowed_extensions):
-                continue
-            rel_path = os.path.relpath(os.path.join(root, filename), template_dir)
-            rel_path = rel_path.replace(os.sep, "/")
-            template = env.get_template(rel_path)
-            base_name = os.path.splitext(filename)[0]
-            rel_without_ext = os.path.splitext(rel_path)[0]
-            for key in (rel_path, rel_without_ext, base_name):
-                if key not in templates:
-                    templates[key] = template
-    return templates
-
-
-def parse_file(filepath, pygments_theme, markdown_config=None):
+    names = _load_template_index(template_dir, allowed_extensions)
+    if names is not None:
+        return TemplateRegistry(env, names)
+
+    names = {}
+    visited = []
+    for entry, rel_path in _scan_files(template_dir, allowed_extensions, visited=visited):
+        base_name = os.path.splitext(entry.name)[0]
+        rel_without_ext = os.path.splitext(rel_path)[0]
+        for key in (rel_path, rel_without_ext, base_name):
+            if key not in names:
+                names[key] = rel_path
+
+    index = {
+        "root": template_dir,
+        "extensions": list(allowed_extensions or ()),
+        "dirs": {path: os.stat(path).st_mtime_ns for path in visited},
+        "names": names,
+    }
+    os.makedirs(os.path.dirname(TEMPLATE_INDEX_CACHE), exist_ok=True)
     try:
-        with open(filepath, "r", encoding="utf-8") as f:
-            file_content = f.read()
+        _write_text(TEMPLATE_INDEX_CACHE, json.dumps(index))
+    except OSError as e:
+        print(f"Warning: Could not save template index: {e}")
+    return TemplateRegistry(env, names)
+
+
+def _cache_source_key(filepath):
+    return os.path.relpath(filepath).replace(os.sep, "/")
+
+
+def parse_file(filepath, md, md_cache=None, cache_salt=""):
+    try:
+        file_content = _read_text(filepath)
     except OSError as e:
         print(f"Error: Could not read file {filepath}: {e}")
         return None, None
 
+    page_config = {}
+    markdown_data = file_content
     if file_content.startswith("---"):
+        # Slice around the closing delimiter rather than splitting, which
+        # would copy the whole body into an intermediate list.
+        end = file_content.find("\n---", 3)
+        if end == -1:
+            print(f"Error parsing YAML frontmatter in {filepath}: missing closing '---'")
+        else:
+            try:
+                page_config = yaml.load(file_content[3:end], Loader=_YAMLLoader) or {}
+                markdown_data = file_content[end + 4:]
+            except yaml.YAMLError as e:
+                print(f"Error parsing YAML frontmatter in {filepath}: {e}")
+
+    html_data = None
+    cache_key = None
+    if md_cache is not None:
+        cache_key = hashlib.sha256(
+            cache_salt.encode("utf-8") + markdown_data.encode("utf-8")
+        ).hexdigest()[:16]
+        cache_path = os.path.join(MARKDOWN_CACHE_DIR, f"{cache_key}.html")
         try:
-            parts = file_content.split("---", 2)
-            page_config = yaml.safe_load(parts[1]) or {}
-            markdown_data = parts[2]
-        except (IndexError, yaml.YAMLError) as e:
-            print(f"Error parsing YAML frontmatter in {filepath}: {e}")
-            page_config = {}
-            markdown_data = file_content
-    else:
-        page_config = {}
-        markdown_data = file_content
+            html_data = _read_text(cache_path)
+        except (OSError, UnicodeDecodeError):
+            pass
 
-    md = build_markdown(pygments_theme, markdown_config)
-    html_data = md.convert(markdown_data)
-    md.reset()
+    if html_data is None:
+        html_data = md.convert(markdown_data)
+        md.reset()
+        if md_cache is not None:
+            os.makedirs(MARKDOWN_CACHE_DIR, exist_ok=True)
+            try:
+                _replace_text(cache_path, html_data)
+            except OSError as e:
+                print(f"Warning: Could not cache rendered markdown for {filepath}: {e}")
+                cache_key = None
+    if md_cache is not None and cache_key:
+        md_cache[_cache_source_key(filepath)] = cache_key
 
     rel_path = os.path.relpath(filepath, CONTENT_DIR)
     
@@ -639,96 +1050,319 @@ def parse_file(filepath, pygments_theme, markdown_config=None):
         page_config["url"] = "/" + url_path
 
     # Normalize date to YYYY-MM-DD string
+    sort_date = datetime.min
     if "date" in page_config and page_config["date"]:
         parsed_date = safe_parse_date(page_config["date"])
         if parsed_date:
             page_config["date"] = parsed_date.strftime("%Y-%m-%d")
-        else:
-            pass
+            # Sort on the normalized day so ordering matches the shown date
+            sort_date = datetime(parsed_date.year, parsed_date.month, parsed_date.day)
+    page_config["_sort_date"] = sort_date
+    page_config["_sort_order"] = page_config.get("order", 999)
 
     return page_config, html_data
 
 
+def _parallel_workers(count):
+    # Process pools only pay for their startup on larger sites.
+    workers = os.cpu_count() or 1
+    if count < PARALLEL_MIN_FILES or workers < 2:
+        return 0
+    return workers
+
+
+_worker_md = None
+
+
+def _init_parse_worker(extensions, extension_configs):
+    global _worker_md
+    _worker_md = build_markdown(extensions, extension_configs)
+
+
+def _parse_worker(filepath, cache_salt="", use_cache=True):
+    cache_entries = {} if use_cache else None
+    page_data, html_content = parse_file(filepath, _worker_md, cache_entries, cache_salt)
+    return page_data, html_content, cache_entries
+
+
+def parse_files(filepaths, md, md_config, md_cache=None, cache_salt=""):
+    # Markdown conversion is pure Python and CPU-bound, so larger sites fan
+    # out across processes. Each worker builds its own Markdown instance.
+    workers = _parallel_workers(len(filepaths))
+    if not workers:
+        return [parse_file(filepath, md, md_cache, cache_salt) for filepath in filepaths]
+
+    worker = functools.partial(
+        _parse_worker, cache_salt=cache_salt, use_cache=md_cache is not None
+    )
+    results = []
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_parse_worker,
+        initargs=md_config,
+    ) as executor:
+        for page_data, html_content, cache_entries in executor.map(
+            worker, filepaths, chunksize=8
+        ):
+            if cache_entries:
+                md_cache.update(cache_entries)
+            results.append((page_data, html_content))
+    return results
+
+
+def render_tag_page(tag_template, site_config, tag_name, posts_with_tag, image_manifest=None):
+    tag_page_html = tag_template.render(
+        site=site_config,
+        tag_name=tag_name,
+        posts=posts_with_tag,
+        page={"title": f"Tag: {tag_name}"},
+    )
+    tag_page_html = replace_images_with_processed(tag_page_html, image_manifest)
+    return os.path.join(OUTPUT_DIR, "tags", f"{tag_name}.html"), tag_page_html
+
+
+def write_tag_page(tag_name, output_path, tag_page_html):
+    try:
+        _write_text(output_path, tag_page_html)
+        print(f"Generated tag page: tags/{tag_name}.html")
+    except OSError as e:
+        print(f"Error: Failed to write tag page {output_path}: {e}")
+
+
+_worker_tag_state = None
+
+
+def _init_tag_worker(template_name, site_config, image_manifest):
+    global _worker_tag_state
+    tag_template = build_environment().get_template(template_name)
+    _worker_tag_state = (tag_template, site_config, image_manifest)
+
+
+def _tag_worker(item):
+    tag_template, site_config, image_manifest = _worker_tag_state
+    tag_name, posts_with_tag = item
+    write_tag_page(
+        tag_name,
+        *render_tag_page(tag_template, site_config, tag_name, posts_with_tag, image_manifest),
+    )
+
+
 def tag_pages(tag_template, site_config, tags=None, image_manifest=None):
+    # Posts arrive already sorted per tag; each tag page is independent, so
+    # this follows render_pages: a process pool on larger sites, otherwise
+    # render here and hand the writes to a thread.
     tags = tags or {}
-    tags_dir = os.path.join(OUTPUT_DIR, "tags")
-    os.makedirs(tags_dir, exist_ok=True)
-
-    for tag_name, posts_with_tag in tags.items():
-        posts_with_tag.sort(
-            key=lambda x: (
-                safe_parse_date(x.get("date")) or datetime.min
-            ),
-            reverse=True
-        )
-        tag_page_html = tag_template.render(
-            site=site_config,
-            tag_name=tag_name,
-            posts=posts_with_tag,
-            page={"title": f"Tag: {tag_name}"},
-        )
-        tag_page_html = replace_images_with_processed(tag_page_html, image_manifest)
-        output_path = os.path.join(tags_dir, f"{tag_name}.html")
-        try:
-            with open(output_path, "w", encoding="utf-8") as f:
-                f.write(tag_page_html)
-            print(f"Generated tag page: tags/{tag_name}.html")
-        except OSError as e:
-            print(f"Error: Failed to write tag page {output_path}: {e}")
+    os.makedirs(os.path.join(OUTPUT_DIR, "tags"), exist_ok=True)
+
+    workers = _parallel_workers(len(tags))
+    if not workers:
+        with ThreadPoolExecutor() as writer:
+            for tag_name, posts_with_tag in tags.items():
+                rendered = render_tag_page(
+                    tag_template, site_config, tag_name, posts_with_tag, image_manifest
+                )
+                writer.submit(write_tag_page, tag_name, *rendered)
+        return
 
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_tag_worker,
+        initargs=(tag_template.name, site_config, image_manifest),
+    ) as executor:
+        for _ in executor.map(_tag_worker, tags.items(), chunksize=8):
+            pass
 
-def render_page(
-    page_config,
-    html_data,
-    site_config,
-    templates,
-    image_manifest=None,
-    **context_data,
-):
+
+def render_page(page_config, html_data, base_ctx, templates, image_manifest=None):
     layout = page_config.get("layout") or "post"
     if layout not in templates:
         available = ", ".join(sorted(templates.keys())) or "none"
         print(
             f"Error: Template '{layout}' not found. Available templates: {available}. Skipping build."
         )
-        return
+        return None
 
     template = templates[layout]
 
-    render_details = {"site": site_config, "page": page_config, "content": html_data}
-    render_details.update(context_data)
-
-    final_html = template.render(render_details)
+    # base_ctx (site plus collections) is built once per build; Jinja layers
+    # the per-page values over it when it creates the render context.
+    final_html = template.render(base_ctx, page=page_config, content=html_data)
     final_html = replace_images_with_processed(final_html, image_manifest)
+    return page_output_path(page_config["url"]), final_html
 
-    if page_config["url"] == "/":
-        output_path = os.path.join(OUTPUT_DIR, "index.html")
-    else:
-        output_path = os.path.join(
-            OUTPUT_DIR, page_config["url"].lstrip("/"), "index.html"
-        )
 
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+def page_output_path(url):
+    if url == "/":
+        return os.path.join(OUTPUT_DIR, "index.html")
+    return os.path.join(OUTPUT_DIR, url.lstrip("/"), "index.html")
+
+
+def write_page(url, output_path, final_html):
     try:
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(final_html)
-        print(
-            f"Generated: {page_config['url'] if page_config['url'] != '/' else '/index.html'}"
-        )
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        _write_text(output_path, final_html)
+        print(f"Generated: {url if url != '/' else '/index.html'}")
+        return True
     except OSError as e:
         print(f"Error: Failed to write page {output_path}: {e}")
+        return False
 
 
+def _render_signature(site_config, page_config, html_data, template):
+    # Everything a single-page render reads: the config, frontmatter and
+    # body, the layout source, and stamps for the rest of the templates
+    # (layouts extend base templates) and the image manifest.
+    template_stamps = []
+    for entry, rel in _scan_files(TEMPLATE_DIR):
+        st = entry.stat()
+        template_stamps.append([rel, st.st_size, st.st_mtime_ns])
+    try:
+        st = os.stat(IMAGE_MANIFEST_PATH)
+        manifest_stamp = [st.st_size, st.st_mtime_ns]
+    except OSError:
+        manifest_stamp = None
+    layout_source = _read_text(template.filename) if template.filename else ""
+    return _digest(
+        "page",
+        site_config,
+        page_config,
+        html_data,
+        layout_source,
+        template_stamps,
+        manifest_stamp,
+    )
+
+
+_worker_render_state = None
+
+
+def _init_render_worker(base_ctx, image_manifest):
+    # Jinja templates are not picklable, so each worker loads its own
+    # environment; the read-only render inputs arrive once via initargs.
+    global _worker_render_state
+    templates = load_templates(build_environment())
+    _worker_render_state = (base_ctx, templates, image_manifest)
+
+
+def _render_worker(page):
+    base_ctx, templates, image_manifest = _worker_render_state
+    rendered = render_page(
+        page["data"], page["content"], base_ctx, templates, image_manifest
+    )
+    if rendered:
+        write_page(page["data"]["url"], *rendered)
+
+
+def render_pages(pages, base_ctx, templates, image_manifest=None):
+    workers = _parallel_workers(len(pages))
+    if not workers:
+        # Rendering holds the GIL but writes release it, so hand each page to
+        # a writer thread and carry on rendering the next one.
+        with ThreadPoolExecutor() as writer:
+            for page in pages:
+                rendered = render_page(
+                    page["data"], page["content"], base_ctx, templates, image_manifest
+                )
+                if rendered:
+                    writer.submit(write_page, page["data"]["url"], *rendered)
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_render_worker,
+        initargs=(base_ctx, image_manifest),
+    ) as executor:
+        for _ in executor.map(_render_worker, pages, chunksize=8):
+            pass
+
+
+class ImageManifest(dict):
+    """Prepared manifest entries keyed by their path under the images
+    directory, with a basename fallback for names that are unique."""
+
+    def __init__(self, entries=(), names=None):
+        super().__init__(entries)
+        self.names = names or {}
+
+    def lookup(self, relative):
+        if relative in self:
+            return self[relative]
+        return self.names.get(relative.rsplit("/", 1)[-1])
+
 
 def load_image_manifest(path=IMAGE_MANIFEST_PATH):
     if not os.path.exists(path):
-        return {}
+        return ImageManifest()
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        raw = json.loads(_read_text(path))
     except json.JSONDecodeError as exc:
         print(f"Warning: Unable to parse image manifest {path}: {exc}")
-        return {}
+        return ImageManifest()
+
+    # Keys are paths relative to the images directory (with backslashes when
+    # the manifest was written on Windows). An image whose src points
+    # elsewhere still resolves by basename, but only when exactly one
+    # manifest file has that name; otherwise it could serve the wrong image.
+    manifest = ImageManifest()
+    keys_by_name = defaultdict(set)
+    for key, entry in raw.items():
+        if not isinstance(entry, dict):
+            continue
+        key = key.replace("\\", "/")
+        manifest[key] = _prepare_manifest_entry(entry)
+        keys_by_name[key.rsplit("/", 1)[-1]].add(key)
+    manifest.names = {
+        name: manifest[next(iter(keys))]
+        for name, keys in keys_by_name.items()
+        if len(keys) == 1
+    }
+    return manifest
+
+
+_PICTURE_FORMATS = ("avif", "webp", "jpg", "jpeg", "png")
+_FALLBACK_FORMATS = ("jpg", "jpeg", "png", "webp", "avif")
+_FORMAT_MIME = {"jpg": "image/jpeg", "jpeg": "image/jpeg"}
+
+
+def _prepare_manifest_entry(entry):
+    # Compile an entry down to the strings a <picture> needs: a tuple of
+    # (mime, srcset) sources plus the fallback src and srcset. Only the sizes
+    # value varies per <img>, so nothing else is rebuilt per image, and the
+    # flat tuples are cheap to ship to render workers. Entries without a
+    # usable variant become None, which leaves the <img> untouched.
+    srcsets = {}
+    for fmt in _PICTURE_FORMATS:
+        variants = entry.get(fmt)
+        if not isinstance(variants, list):
+            continue
+        usable = [v for v in variants if v.get("path") and v.get("width")]
+        if not usable:
+            continue
+        usable.sort(key=operator.itemgetter("width"))
+        urls = [
+            v["path"] if v["path"].startswith("http") else "/" + v["path"]
+            for v in usable
+        ]
+        srcset = ", ".join(f"{url} {v['width']}w" for url, v in zip(urls, usable))
+        srcsets[fmt] = (urls[-1], srcset)
+
+    if not srcsets:
+        return None
+    sources = tuple(
+        (_FORMAT_MIME.get(fmt, f"image/{fmt}"), srcsets[fmt][1])
+        for fmt in _PICTURE_FORMATS
+        if fmt in srcsets
+    )
+    fallback_format = next(fmt for fmt in _FALLBACK_FORMATS if fmt in srcsets)
+    fallback_src, fallback_srcset = srcsets[fallback_format]
+    return sources, fallback_src, fallback_srcset
+
+
+# Same replacements as html.escape(quote=True), applied in one C-level pass.
+_ATTR_ESCAPE_TABLE = str.maketrans(
+    {"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#x27;"}
+)
+_ATTR_NEEDS_ESCAPE_RE = re.compile(r"[&<>\"']")
 
 
 def _render_attributes(attrs):
@@ -737,7 +1371,10 @@ def _render_attributes(attrs):
         if value is None:
             parts.append(f" {name}")
         else:
-            parts.append(f' {name}="{escape(str(value), quote=True)}"')
+            value = str(value)
+            if _ATTR_NEEDS_ESCAPE_RE.search(value):
+                value = value.translate(_ATTR_ESCAPE_TABLE)
+            parts.append(f' {name}="{value}"')
     return "".join(parts)
 
 
@@ -745,63 +1382,10 @@ def _build_picture_element(attrs, manifest_entry):
     if not manifest_entry:
         return None
 
+    sources, fallback_src, fallback_srcset = manifest_entry
     attrs_dict = {name.lower(): value for name, value in attrs}
     sizes_value = attrs_dict.get("data-img-sizes") or attrs_dict.get("sizes") or "100vw"
 
-    format_priority = ["avif", "webp", "jpg", "jpeg", "png"]
-    fallback_priority = ["jpg", "jpeg", "png", "webp", "avif"]
-    mime_overrides = {"jpg": "image/jpeg", "jpeg": "image/jpeg"}
-
-    sources = []
-    for fmt in format_priority:
-        variants = manifest_entry.get(fmt)
-        if not variants:
-            continue
-        sorted_variants = sorted(
-            (v for v in variants if v.get("path") and v.get("width")),
-            key=lambda item: item["width"],
-        )
-        if not sorted_variants:
-            continue
-        srcset = ", ".join(
-            f"{variant['path'] if variant['path'].startswith('http') else '/' + variant['path']} {variant['width']}w"
-            for variant in sorted_variants
-        )
-        mime = mime_overrides.get(fmt, f"image/{fmt}")
-        sources.append(
-            f'<source type="{mime}" srcset="{srcset}" sizes="{sizes_value}">'
-        )
-
-    if not sources:
-        return None
-
-    fallback_format = next(
-        (fmt for fmt in fallback_priority if manifest_entry.get(fmt)), None
-    )
-    if not fallback_format:
-        return None
-
-    fallback_variants = sorted(
-        (
-            v
-            for v in manifest_entry[fallback_format]
-            if v.get("path") and v.get("width")
-        ),
-        key=lambda item: item.get("width", 0),
-    )
-    if not fallback_variants:
-        return None
-
-    if fallback_variants[-1]['path'].startswith("http"):
-        fallback_src = fallback_variants[-1]['path']
-    else:
-        fallback_src = f"/{fallback_variants[-1]['path']}"
-
-    fallback_srcset = ", ".join(
-        f"{variant['path'] if variant['path'].startswith('http') else '/' + variant['path']} {variant['width']}w" 
-        for variant in fallback_variants
-    )
-
     filtered_attrs = [
         (name, value)
         for (name, value) in attrs
@@ -813,83 +1397,87 @@ def _build_picture_element(attrs, manifest_entry):
     fallback_attrs.append(("sizes", sizes_value))
 
     img_tag = "<img{}>".format(_render_attributes(fallback_attrs))
-    sources_html = "".join(sources)
+    sources_html = "".join(
+        f'<source type="{mime}" srcset="{srcset}" sizes="{sizes_value}">'
+        for mime, srcset in sources
+    )
     return f"<picture>{sources_html}{img_tag}</picture>"
 
 
-class ImageReplacementParser(HTMLParser):
-    def __init__(self, manifest):
-        super().__init__(convert_charrefs=False)
-        self.manifest = manifest or {}
-        self.output = []
-
-    def handle_starttag(self, tag, attrs):
-        self._handle_start(tag, attrs)
-
-    def handle_startendtag(self, tag, attrs):
-        self._handle_start(tag, attrs)
-
-    def handle_endtag(self, tag):
-        self.output.append(f"</{tag}>")
-
-    def handle_data(self, data):
-        self.output.append(data)
-
-    def handle_comment(self, data):
-        self.output.append(f"<!--{data}-->")
-
-    def handle_decl(self, decl):
-        self.output.append(f"<!{decl}>")
-
-    def handle_entityref(self, name):
-        self.output.append(f"&{name};")
-
-    def handle_charref(self, name):
-        self.output.append(f"&#{name};")
+# Comments and raw-text elements are matched so they pass through untouched,
+# mirroring what an HTML tokenizer would treat as non-markup.
+_IMG_RE = re.compile(
+    r"<!--.*?-->"
+    r"|<(script|style)\b.*?</\1\s*>"
+    r"|<img(?=[\s/>])(?:[^>\"']|\"[^\"]*\"|'[^']*')*>",
+    re.IGNORECASE | re.DOTALL,
+)
+_IMG_ATTR_RE = re.compile(
+    r"""([^\s/>"'=][^\s/>"'=]*)(?:\s*=\s*("[^"]*"|'[^']*'|[^\s>]*))?"""
+)
+
+
+def _parse_img_attributes(tag):
+    attrs = []
+    for match in _IMG_ATTR_RE.finditer(tag, 4, len(tag) - 1):
+        name, value = match.groups()
+        if value is not None:
+            if value[:1] in ("'", '"'):
+                value = value[1:-1]
+            if "&" in value:
+                value = unescape(value)
+        attrs.append((name.lower(), value))
+    return attrs
+
+
+def _maybe_replace(tag, manifest):
+    attrs = _parse_img_attributes(tag)
+    attrs_dict = dict(attrs)
+    src = attrs_dict.get("src")
+    if not src:
+        return None
 
-    def handle_pi(self, data):
-        self.output.append(f"<?{data}>")
+    normalized = src.split("?", 1)[0].split("#", 1)[0].lstrip("/")
+    if normalized.startswith("./"):
+        normalized = normalized[2:]
+    if "assets/images/" not in normalized:
+        return None
 
-    def _handle_start(self, tag, attrs):
-        if tag.lower() == "img":
-            replacement = self._build_replacement(attrs)
-            if replacement:
-                self.output.append(replacement)
-                return
-        raw = self.get_starttag_text()
-        if raw:
-            self.output.append(raw)
+    relative = normalized.split("assets/images/", 1)[1]
+    manifest_entry = manifest.lookup(relative)
+    if not manifest_entry:
+        return None
 
-    def _build_replacement(self, attrs):
-        attrs_dict = {k.lower(): v for k, v in attrs}
-        src = attrs_dict.get("src")
-        if not src:
-            return None
+    return _build_picture_element(attrs, manifest_entry)
 
-        normalized = src.split("?", 1)[0].split("#", 1)[0].lstrip("/")
-        if normalized.startswith("./"):
-            normalized = normalized[2:]
-        if "assets/images/" not in normalized:
-            return None
 
-        relative = normalized.split("assets/images/", 1)[1]
-        manifest_entry = self.manifest.get(os.path.basename(relative))
-        if not manifest_entry:
-            return None
+def replace_images_with_processed(html, manifest):
+    if not html or not manifest:
+        return html
 
-        return _build_picture_element(attrs, manifest_entry)
+    def _replace(match):
+        tag = match.group(0)
+        if match.group(1) or tag.startswith("<!"):
+            return tag
+        return _maybe_replace(tag, manifest) or tag
 
-    def get_html(self):
-        return "".join(self.output)
+    return _IMG_RE.sub(_replace, html)
 
 
-def replace_images_with_processed(html, manifest):
-    if not html or not manifest:
-        return html
-    parser = ImageReplacementParser(manifest)
-    parser.feed(html)
-    parser.close()
-    return parser.get_html()
+def write_sitemap(site_config, urls, output_path=None):
+    # The sitemap is a flat list of URLs, so a string join does the job of a
+    # full template render.
+    base_url = str(site_config.get("base_url") or "").rstrip("/")
+    entries = "".join(
+        f"  <url><loc>{xml_escape(base_url + url)}</loc></url>\n" for url in urls
+    )
+    sitemap_xml = (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+        f"{entries}</urlset>\n"
+    )
+    output_path = output_path or os.path.join(OUTPUT_DIR, "sitemap.xml")
+    _write_bytes(output_path, sitemap_xml.encode("utf-8"))
 
 
 def main():
@@ -913,10 +1501,15 @@ def main():
         )
         return
 
-    site_config, pygments_theme = generate_styles()
-    env = Environment(loader=FileSystemLoader(TEMPLATE_DIR))
+    site_config = load_site_config()
+    # Single-file rebuilds only touch the CSS when config.yaml changed.
+    pygments_theme = regenerate_css(site_config, only_if_changed=bool(args.file))
+    env = build_environment()
     templates = load_templates(env)
     image_manifest = load_image_manifest()
+    md_config = _resolve_md_config(site_config.get("markdown"), pygments_theme)
+    md = build_markdown(*md_config)
+    md_salt = _markdown_cache_salt(*md_config)
 
     if args.file:
         print(f"Change detected in {args.file}, proceeding to rebuild...")
@@ -933,118 +1526,128 @@ def main():
                 os.remove(PAGE_SLUG_CACHE)
             return
 
-        if not has_file_changed(args.file):
+        file_stamps = _load_json_dict(FILE_STAMP_CACHE)
+        if not has_file_changed(args.file, file_stamps):
             print(
-                f"No changes detected in {args.file} based on cache; rebuilding anyway."
+                f"No changes detected in {args.file} based on cache."
             )
+        _save_json(FILE_STAMP_CACHE, file_stamps, "file stamps")
 
-        page_data, html_content = parse_file(
-            args.file, pygments_theme, site_config.get("markdown")
-        )
+        md_cache = load_markdown_cache_index()
+        page_data, html_content = parse_file(args.file, md, md_cache, md_salt)
+        save_markdown_cache_index(md_cache)
         if page_data is None or html_content is None:
             return
-        render_page(
+
+        # Skip the render when nothing it reads has changed since the last
+        # time this page was written and the output is still there.
+        url = page_data["url"]
+        layout = page_data.get("layout") or "post"
+        render_sigs = _load_json_dict(RENDER_SIG_CACHE)
+        sig = None
+        if layout in templates:
+            sig = _render_signature(site_config, page_data, html_content, templates[layout])
+            if render_sigs.get(url) == sig and os.path.exists(page_output_path(url)):
+                print(f"Unchanged: {url} is up to date; skipping render.")
+                return
+
+        rendered = render_page(
             page_data,
             html_content,
-            site_config,
+            {"site": site_config},
             templates,
             image_manifest=image_manifest,
         )
+        if rendered and write_page(url, *rendered) and sig:
+            render_sigs[url] = sig
+            _save_json(RENDER_SIG_CACHE, render_sigs, "render signatures")
     else:
         print("Running a full build...")
         sitemap_list = []
         all_posts = []
         pages = []
-        tags = {}
+        tags = defaultdict(list)
 
         clean_output(OUTPUT_DIR)
 
         current_slugs = set()
         previous_slugs = load_previous_slugs()
+        md_cache = load_markdown_cache_index()
 
         # Dynamic collections: layout -> list of pages
         collections = defaultdict(list)
+        # Layouts with any dated / ordered page, noted during ingest
+        dated_layouts = set()
+        ordered_layouts = set()
+
+        sources = list(_scan_files(CONTENT_DIR, CONTENT_SUFFIXES))
+        parsed = parse_files(
+            [entry.path for entry, _ in sources],
+            md,
+            md_config,
+            md_cache,
+            md_salt,
+        )
 
-        for root, _, files in os.walk(CONTENT_DIR):
-            for filename in files:
-                if not filename.endswith(".md"):
-                    continue
-                
-                filepath = os.path.join(root, filename)
-                page_data, html_content = parse_file(
-                    filepath, pygments_theme, site_config.get("markdown")
-                )
-                if not page_data:
-                    continue
-                if str(page_data.get("draft")).lower() in ("true", "1", "yes"):
-                    continue
-                
-                # Determine slug/key for caching mechanism
-                # We use the relative path without extension as the key
-                rel_path = os.path.relpath(filepath, CONTENT_DIR)
-                slug_key = os.path.splitext(rel_path)[0].replace(os.sep, "/")
-                current_slugs.add(slug_key)
-
-                pages.append({"data": page_data, "content": html_content})
-                sitemap_list.append(page_data["url"])
-                
-                layout = page_data.get("layout")
-                if layout:
-                    collections[layout].append(page_data)
-                    
-                    if layout == "post":
-                        for tag in page_data.get("tags") or []:
-                             tags.setdefault(tag, []).append(page_data)
-
-        removed = previous_slugs - current_slugs
-        for slug in removed:
-             if slug == "index":
-                 continue
-             out_dir = os.path.join(OUTPUT_DIR, slug)
-             if os.path.isdir(out_dir):
-                 try:
-                     shutil.rmtree(out_dir, onerror=_on_rm_error)
-                     print(f"Removed stale page directory: {out_dir}")
-                 except Exception as e:
-                     print(f"Warning: Could not remove stale page directory {out_dir}: {e}")
+        for (entry, rel_path), (page_data, html_content) in zip(sources, parsed):
+            if not page_data:
+                continue
+            if str(page_data.get("draft")).lower() in ("true", "1", "yes"):
+                continue
+
+            # Determine slug/key for caching mechanism
+            # We use the relative path without extension as the key; rel_path
+            # is already POSIX and always carries the matched suffix
+            slug_key = rel_path[:rel_path.rfind(".")]
+            current_slugs.add(slug_key)
+
+            pages.append({"data": page_data, "content": html_content})
+            sitemap_list.append(page_data["url"])
+
+            layout = page_data.get("layout")
+            if layout:
+                collections[layout].append(page_data)
+                if page_data.get("date"):
+                    dated_layouts.add(layout)
+                if page_data.get("order") is not None:
+                    ordered_layouts.add(layout)
+
+                if layout == "post":
+                    for tag in page_data.get("tags") or ():
+                        tags[tag].append(page_data)
+
+        # One sort per tag, newest first, on the date precomputed at parse time
+        for posts_with_tag in tags.values():
+            posts_with_tag.sort(key=operator.itemgetter("_sort_date"), reverse=True)
+
+        remove_stale_pages(
+            slug for slug in previous_slugs if slug not in current_slugs
+        )
 
         save_current_slugs(current_slugs)
+        save_markdown_cache_index(
+            md_cache, {_cache_source_key(entry.path) for entry, _ in sources}
+        )
 
         # Generic date sorting for all collections
         for layout_name, items in collections.items():
             if not items:
                 continue
-            
-            # Check if any item has a date
-            has_date = any(x.get("date") for x in items)
-            has_order = any(x.get("order") is not None for x in items)
-            
-            if has_date:
-                     items.sort(
-                        key=lambda x: (
-                            safe_parse_date(x.get("date")) or datetime.min
-                        ),
-                        reverse=True,
-                    )
-            elif has_order:
-                 items.sort(key=lambda x: x.get("order", 999))
+
+            if layout_name in dated_layouts:
+                     # parse_file already parsed each date into _sort_date
+                     items.sort(key=operator.itemgetter("_sort_date"), reverse=True)
+            elif layout_name in ordered_layouts:
+                 items.sort(key=operator.itemgetter("_sort_order"))
             else:
                  pass
 
-        context_data = {}
+        base_ctx = {"site": site_config}
         for k, v in collections.items():
             w = k.replace("-", "_") + "s"
-            context_data[w] = v
+            base_ctx[w] = v
 
-        for page in pages:
-            render_page(
-                page["data"],
-                page["content"],
-                site_config,
-                templates,
-                image_manifest=image_manifest,
-                **context_data
-            )
+        render_pages(pages, base_ctx, templates, image_manifest)
 
         tag_template = templates.get("tags") or templates.get("tags.html")
         if tag_template:
@@ -1057,12 +1660,8 @@ def main():
         else:
             print("Warning: tags template not found; skipping tag page generation.")
 
-        sitemap_template = env.get_template("sitemap.xml.j2")
-        sitemap_xml = sitemap_template.render(site=site_config, pages=sitemap_list)
-        sitemap_xml = sitemap_template.render(site=site_config, pages=sitemap_list)
         try:
-            with open(os.path.join(OUTPUT_DIR, "sitemap.xml"), "w") as f:
-                f.write(sitemap_xml)
+            write_sitemap(site_config, sitemap_list)
             print("Generated sitemap.xml")
         except OSError as e:
             print(f"Error: Failed to write sitemap.xml: {e}")